@@ -130,6 +130,13 @@ classdef odbQuery < handle
                 end
             end
 
+            % python sends positions as integer codes into positionNames (-1 if it didn't recognise the position), so
+            % turn them back into names here
+            if isfield(inpStruct, 'positionNames') && isnumeric(obj.positions)
+                names = [{'UNKNOWN'}, cellstr(inpStruct.positionNames(:)')];
+                obj.positions = names(double(obj.positions) + 2);
+            end
+
         end
 
         function val = get.dataName(obj)
@@ -1,4 +1,4 @@
 ## initialise the handlers sub_module
 # these currently all run WITHOUT the CAE kernel
-from .job_ import job
+from .job_ import job, asCompleted
 from .odb_ import odb
\ No newline at end of file
@@ -5,13 +5,18 @@ Can be run with or without the Abaqus kernel.
 
 
 import os
+import locale
 import shutil
 import stat
+import time
 from abaqusConstants import *
 
 class job:
     outputDirName = 'bin'
     inputDirName = 'source'
+    makeBatDefault = True       # whether run() writes a .bat when not told either way. Set job.makeBatDefault = False once for big sweeps
+
+    _submitted = {}             # jobs that have been submitted and not yet waited for, keyed by absolute bin folder path
 
     # The class will place files in the following structure:
     # binFolder/source - input files
@@ -22,6 +27,7 @@ class job:
         self.jobJect = jobObject                                                # an instance of an Abaqus job object
         self.name = jobObject.name                                              # name of the job
         self.binFolder = binFolder                                              # folder to store job files
+        self.binAbsPath = os.path.abspath(self.binFolder)                       # absolute path to it, fixed now in case the working directory changes
         self.inpDirPath = os.path.join(self.binFolder, self.inputDirName)       # relative path to input directory
         self.outDirPath = os.path.join(self.binFolder, self.outputDirName)      # relative path to output directory
         self.inpFileName = self.name + '.inp'                                   # name of the input file
@@ -29,7 +35,30 @@ class job:
         self.debug = debug                                                      # debug flag
 
 
-    def run(self, makeBat=True):
+    def run(self, makeBat=None):
+
+        # submit the job and wait for completion
+        self.submitAsync(makeBat=makeBat)
+        print("Job submitted. Waiting for completion...")
+        self.wait()
+        print("Job completed.")
+
+
+    def submitAsync(self, makeBat=None):
+        '''
+        Prepare and submit the job, returning as soon as it has been submitted rather than waiting for it to finish.
+        Call wait() (or use asCompleted()) to collect it afterwards.
+        The bin folder gets wiped on submission, so this raises a RuntimeError if a job that is still running (including
+        this one) uses the same one. Give each job you run at once its own binFolder.
+        This is not thread-safe: writing the input file and submitting both change the process's working directory
+        (restoring it afterwards), so submit jobs from one thread only.
+        '''
+
+        # don't wipe the files of a job that is still running
+        binAbsPath = self.binAbsPath
+        other = job._submitted.get(binAbsPath)
+        if other is not None and other.jobJect.status not in (COMPLETED, ABORTED, TERMINATED):
+            raise RuntimeError("Job '{}' is still running in bin folder {}. Give each job you run at once its own binFolder.".format(other.name, binAbsPath))
 
         # make the bin folder if it doesn't exist
         self.makeBinFolder()
@@ -38,22 +67,37 @@ class job:
         self.writeINP()
 
         # make a .bat file to run the job if requested
+        if makeBat is None:
+            makeBat = self.__class__.makeBatDefault
         if makeBat:
             self.writeSubmissionBat()                            
 
-        # note where we are and change to the output directory
+        # abaqus runs the job in whichever directory it was submitted from, so we do still have to change to the output
+        # directory to submit. We can change straight back once it's submitted though.
         currDir = os.getcwd()
         os.chdir(self.outDirPath)
+        try:
+            self.jobJect.submit()       # no need to do the consistency check, we've done it already in writeINP
+        finally:
+            os.chdir(currDir)
+        job._submitted[binAbsPath] = self
 
-        # submit the job and wait for completion
-        self.jobJect.submit()           # no need to do the consistency check, we've done it already in writeINP
-        print("Job submitted. Waiting for completion...")
+        return self
+
+
+    def wait(self):
+        '''
+        Wait for a submitted job to finish, then clean up after it.
+        '''
         self.jobJect.waitForCompletion()
-        print("Job completed.")
+        binAbsPath = self.binAbsPath
+        if job._submitted.get(binAbsPath) is self:
+            del job._submitted[binAbsPath]
 
-        # clean up the input file and return to where we were
-        os.remove(self.name + '.inp')
-        os.chdir(currDir) 
+        # clean up the copy of the input file that submit() leaves in the output directory
+        leftoverInp = os.path.join(binAbsPath, self.outputDirName, self.inpFileName)
+        if os.path.exists(leftoverInp):
+            os.remove(leftoverInp)
 
 
 
@@ -70,21 +114,25 @@ class job:
         else:
             consChecking = OFF
         
-        # write the input file, changing back to where we were
+        # writeInput always writes to the current directory, so change to the input directory to write it. Writing it
+        # here and moving it across would clobber any .inp of the same name the user keeps in the current directory.
         currDir = os.getcwd()
         os.chdir(self.inpDirPath)
-        self.jobJect.writeInput(consistencyChecking=consChecking)
-        os.chdir(currDir)
+        try:
+            self.jobJect.writeInput(consistencyChecking=consChecking)
+        finally:
+            os.chdir(currDir)
 
         # make the output directory if it doesn't exist using vintage python syntax
         if not os.path.exists(self.outDirPath):
             os.makedirs(self.outDirPath)   
 
 
-    def writeSubmissionBat(self):
+    def writeSubmissionBat(self, cpus=1, gpus=0, interactive=True):
         """
         Writes a .bat file to the input directory which can be double clicked to run the model, placing output in the output directory.
         This is just to make life easier when debugging, turn it off when running many jobs.
+        cpus, gpus and interactive are passed on to the abaqus command (see _abaqusCmd).
         """
 
         inpRelPath = os.path.join('..', self.inputDirName, self.inpFileName)
@@ -100,7 +148,7 @@ class job:
             "pushd ..\\"+ self.outputDirName,
             "",
             "REM Run Abaqus job",
-            "abaqus job={} input={} interactive".format(self.name, inpRelPath),
+            self._abaqusCmd(inpRelPath, cpus=cpus, gpus=gpus, interactive=interactive),
             "",
             "REM Return to original directory",
             "popd",
@@ -108,12 +156,67 @@ class job:
             "pause"
         ]
 
-        try:
-            with open(batPath, 'w') as f:
-                f.write('\r\n'.join(bat_contents))
-            print("BAT file written to: {}".format(batPath))
-        except IOError as e:
-            print("Failed to write BAT file: {}".format(e))
+        _writeBat(batPath, bat_contents)
+
+
+    @staticmethod
+    def writeBulkBat(jobs, batPath, parallel=1, cpus=1, gpus=0, interactive=True):
+        """
+        Writes a single .bat file which runs a whole list of jobs, rather than one .bat per job.
+        The jobs are dealt out into 'parallel' chains which run side by side, each chain running its jobs one after another.
+        Each job's input file must already have been written (see writeINP). Paths in the .bat are absolute, so it can live anywhere.
+        cpus, gpus and interactive are passed on to the abaqus command for every job (see _abaqusCmd).
+        """
+
+        # deal the jobs out round robin, so each chain gets a similar number of them
+        parallel = max(1, min(parallel, len(jobs)))
+        chains = [jobs[i::parallel] for i in range(parallel)]
+
+        bat_contents = ["@echo off"]
+        if parallel > 1:
+            # the .bat calls itself once per chain, with the chain's label as an argument
+            bat_contents += [
+                "if not \"%~1\"==\"\" goto %~1",
+                "",
+                "REM Start each chain of jobs in its own window",
+            ]
+            for chainID in range(parallel):
+                bat_contents.append("start \"chain{0}\" cmd /c \"\"%~f0\" chain{0}\"".format(chainID))
+            bat_contents += ["goto :eof", ""]
+
+        for chainID, chain in enumerate(chains):
+            if parallel > 1:
+                bat_contents.append(":chain{}".format(chainID))
+            for job_ in chain:
+                outAbsPath = os.path.abspath(job_.outDirPath)
+                inpAbsPath = os.path.abspath(os.path.join(job_.inpDirPath, job_.inpFileName))
+                bat_contents += [
+                    "REM Run Abaqus job " + job_.name,
+                    "if not exist \"{0}\" mkdir \"{0}\"".format(outAbsPath),
+                    "pushd \"{}\"".format(outAbsPath),
+                    "call " + job_._abaqusCmd('"' + inpAbsPath + '"', cpus=cpus, gpus=gpus, interactive=interactive),    # call, otherwise we never come back from abaqus.bat
+                    "popd",
+                    "",
+                ]
+            if parallel > 1:
+                bat_contents += ["goto :eof", ""]
+
+        _writeBat(batPath, bat_contents)
+
+
+    def _abaqusCmd(self, inpPath, cpus=1, gpus=0, interactive=True):
+        """
+        Builds the command line to run this job on the input file at inpPath.
+        With interactive=False, abaqus queues the job and returns straight away, and won't stop to ask before overwriting old files.
+        """
+        cmd = "abaqus job={} input={} cpus={}".format(self.name, inpPath, cpus)
+        if gpus:
+            cmd += " gpus={}".format(gpus)
+        if interactive:
+            cmd += " interactive"
+        else:
+            cmd += " ask_delete=OFF"
+        return cmd
 
 
     def makeBinFolder(self):
@@ -122,10 +225,13 @@ class job:
         Also deletes the existing folder and its contents if it already exists.
         '''
 
-        binAbsPath = os.path.abspath(self.binFolder)
+        binAbsPath = self.binAbsPath
 
         # delete the existing folder and its contents if it already exists
         if os.path.exists(binAbsPath):
+            # nothing to do if it's already there and empty
+            if not os.listdir(binAbsPath):
+                return
             if self.debug:
                 print("Deleting existing bin folder: {}".format(binAbsPath))
             shutil.rmtree(binAbsPath, onerror=self.remove_readonly)
@@ -140,3 +246,50 @@ class job:
         # excinfo = exception info (required but unused)
         os.chmod(path, stat.S_IWRITE)  # make writable
         func(path)  # retry
+
+
+
+def _encodeBat(batText):
+    # plain strings are bytes already, only unicode needs encoding
+    if isinstance(batText, unicode):
+        batText = batText.encode(locale.getpreferredencoding())
+    return batText
+
+
+
+def _writeBat(batPath, batLines):
+    '''
+    Writes the lines of a .bat file to batPath, with windows line endings. Reports, rather than raises, any failure.
+    '''
+    try:
+        # encode in the local code page, as writing in text mode would, so non-ascii paths (e.g. user folders) still work
+        batText = _encodeBat('\r\n'.join(batLines))
+        with open(batPath, 'wb', buffering=0) as f:     # one small write, so skip the buffering, and binary keeps the \r\n intact
+            f.write(batText)
+        print("BAT file written to: {}".format(batPath))
+    except (IOError, UnicodeError) as e:
+        print("Failed to write BAT file: {}".format(e))
+
+
+
+def asCompleted(jobs, pollInterval=5.0):
+    '''
+    Yields jobs that have been started with job.submitAsync() as they finish, in the order they finish rather than the
+    order they were submitted. Each job is tidied up with job.wait() before it is handed back.
+
+    Parameters
+    ----------
+    jobs : list of job
+        The submitted jobs to watch.
+    pollInterval : float, optional
+        Seconds to wait between checks on the jobs' status. Default is 5.
+    '''
+    pending = list(jobs)
+    while pending:
+        for job_ in list(pending):
+            if job_.jobJect.status in (COMPLETED, ABORTED, TERMINATED):
+                job_.wait()
+                pending.remove(job_)
+                yield job_
+        if pending:
+            time.sleep(pollInterval)
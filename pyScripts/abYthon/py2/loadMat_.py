@@ -1,7 +1,7 @@
 import scipy.io as spio
 import numpy as np
 
-def loadMat(filename):
+def loadMat(filename, tableFields=()):
     '''  
     This function should be called instead of direct spio.loadmat
     as it cures the problem of not properly recovering python dictionaries
@@ -21,6 +21,10 @@ def loadMat(filename):
     ----------
     filename : str
         Path to the .mat file to be loaded.
+    tableFields : tuple of str, optional
+        Top level fields which hold a 2D cell array (one row per entry). squeeze_me
+        turns a single row cell array into a flat list, so these always come back
+        as a list of rows instead, even if there's only one row.
 
     '''
     def _check_keys(d):
@@ -77,5 +81,8 @@ def loadMat(filename):
     
     # load the mat file and process it
     data = spio.loadmat(filename, struct_as_record=False, squeeze_me=True)
+    for key in tableFields:
+        if key in data:
+            data[key] = np.atleast_2d(data[key])     # undo the squeeze on a single row
     return _check_keys(data)
 
@@ -2,9 +2,23 @@
 import os
 import sys
 
-def logToFile(logFileName='logFile', logDir=os.getcwd()):
+def logToFile(logFileName='logFile', logDir=None):
+    if logDir is None:
+        logDir = os.getcwd()    # worked out here rather than as the default, which would be fixed at import time
     logname = os.path.join(logDir, logFileName + '.log')
-    sys.stdout = open(logname, 'w')
+
+    # point the process' stdout and stderr file descriptors at the log, rather than just swapping sys.stdout, so that
+    # anything abaqus' own (non python) code writes ends up in there too
+    sys.stdout.flush()
+    sys.stderr.flush()
+    logFile = open(logname, 'w')
+    os.dup2(logFile.fileno(), 1)
+    os.dup2(logFile.fileno(), 2)
+    logFile.close()     # 1 and 2 keep the file open now
+
+    # python's writes go through a copy of descriptor 1, so replacing sys.stdout again later can't close the real one.
+    # Line buffered so the log keeps up with what's going on
+    sys.stdout = os.fdopen(os.dup(1), 'w', 1)
     sys.stderr = sys.stdout
     print('Logging shell output to ' +  logname)
 
@@ -12,37 +12,44 @@ def queryODB(inputPath):
     #logToFile(logFileName=scriptName, logDir=os.getcwd())
     
     # load the input data
-    inpData = loadMat(inputPath)
+    inpData = loadMat(inputPath, tableFields=('queries',))
 
-    # get the odb file
-    odbCls = handlers.odb(inpData['odbPath'])
+    # get the odb file. It's closed again at the end, so that nothing (e.g. an abYthonWorker running lots of these)
+    # holds on to it between calls, which would stop a rerun job from overwriting it
+    with handlers.odb(inpData['odbPath']) as odbCls:
+        outputDict = _runQueries(odbCls, inpData['queries'])
 
+    # save the output data. It's only scratch data for matlab to read straight back in, so don't spend time compressing it
+    sio.savemat(inpData['outPath'], {inpData['outDataFieldName']: outputDict}, do_compression=False, long_field_names=True)
+
+
+def _runQueries(odbCls, queries):
+    '''
+    Runs the queries (always a list of them, even if there's only one) on odbCls, returning their outputs in the same order.
+    '''
     # initialise output
-    outputDict = []
-    queries = inpData['queries']
-    if not isinstance(queries[0], list):    # some code to deal with the single query case
-        queries = [queries]
+    outputDict = [None] * len(queries)
+    stepQueries = {}        # field output queries grouped by step, as {stepName: ([query indices], [getMultiFOutputs queries])}
     # loop over the queries
-    for query in queries:
-        # get information about the query
-        stepName = query[0]
-        setName = query[1]
-        instName = query[2]
-        variableName = query[3]
-        compVariant = query[4]
-
+    for queryID, (stepName, setName, instName, variableName, compVariant) in enumerate(queries):
         # determine how to query the odb
         if setName == 'globalHistory':
-            fOutput = odbCls.HoutputFromRegion(stepName=stepName, region='Assembly ASSEMBLY', variableName=variableName)
+            outputDict[queryID] = odbCls.HoutputFromRgn(stepName=stepName, regionName='Assembly ASSEMBLY', variableName=variableName)
         else:
+            # field outputs are collected up and extracted step by step below
             setAsRegion = odbCls.getRegionFromSet(setName=setName, instanceName=instName)
             if type(compVariant) is str:
-                fOutput = odbCls.getMultiFOutput(stepName=stepName, region=setAsRegion, variableName=variableName, invariant=compVariant)
+                fQuery = {'variableName': variableName, 'region': setAsRegion, 'invariant': compVariant}
             else:
-                fOutput = odbCls.getMultiFOutput(stepName=stepName, region=setAsRegion, variableName=variableName, component=compVariant)
+                fQuery = {'variableName': variableName, 'region': setAsRegion, 'component': compVariant}
+            queryIDs, fQueries = stepQueries.setdefault(stepName, ([], []))
+            queryIDs.append(queryID)
+            fQueries.append(fQuery)
 
-        # append to the output list
-        outputDict.append(fOutput)
+    # extract all the field output queries on a step in one pass over its frames, rather than one pass per query
+    for stepName, (queryIDs, fQueries) in stepQueries.items():
+        fOutputs = odbCls.getMultiFOutputs(stepName=stepName, queries=fQueries)
+        for queryID, fOutput in zip(queryIDs, fOutputs):
+            outputDict[queryID] = fOutput
 
-    # save the output data
-    sio.savemat(inpData['outPath'], {inpData['outDataFieldName']: outputDict})
+    return outputDict
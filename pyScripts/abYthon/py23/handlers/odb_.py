@@ -6,26 +6,166 @@ Can be used with or without the CAE kernel.
 from odbAccess import openOdb
 from abaqusConstants import *
 import numpy as np
+import operator
+from concurrent.futures import ThreadPoolExecutor
+import os
+import atexit
+from collections import OrderedDict
+
+# odbs we've opened, keyed by absolute path, so that any other odb handler in the same process asking for the same file
+# gets the already open one rather than opening it again. Each is stored as (odb, stamp), where stamp is the file's
+# modification time and size when we opened it, so we can tell if it's been rewritten since (e.g. by a rerun job).
+# Least recently opened first, and no more than _MAX_OPEN_ODBS of them are kept open at once.
+_openOdbs = OrderedDict()
+_MAX_OPEN_ODBS = 8
+
+def _odbStamp(key):
+    try:
+        stat = os.stat(key)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+def _cachedOdb(key):
+    '''
+    Returns the open odb cached under key, or None if there isn't one. If the file has changed since it was opened,
+    the old odb is closed and dropped, and None is returned so it gets opened again.
+    '''
+    entry = _openOdbs.get(key)
+    if entry is None:
+        return None
+    odb_, stamp = entry
+    if _odbStamp(key) != stamp:
+        del _openOdbs[key]
+        odb_.close()
+        return None
+    return odb_
+
+def _openOdbCached(odbPath):
+    '''
+    Returns the open odb at odbPath, opening it (read only) if it isn't already. Returns None if Abaqus can't open it.
+    '''
+    key = os.path.abspath(odbPath)
+    odb_ = _cachedOdb(key)
+    if odb_ is None:
+        stamp = _odbStamp(key)      # before opening, so a change while we open it still counts as a change
+        odb_ = openOdb(odbPath, readOnly=True)      # we only ever read from it, and read only skips the lock and write set up
+        if odb_ is None:
+            return None
+        # make room by closing whichever odb was opened longest ago
+        while len(_openOdbs) >= _MAX_OPEN_ODBS:
+            _, (oldOdb, _) = _openOdbs.popitem(last=False)
+            oldOdb.close()
+    else:
+        stamp = _openOdbs.pop(key)[1]
+    _openOdbs[key] = (odb_, stamp)      # (re)insert at the end as the most recently opened
+    return odb_
+
+@atexit.register
+def _closeOpenOdbs():
+    # close anything still open when python exits, so a script that falls over doesn't leave locks behind
+    while _openOdbs:
+        _, (odb_, _) = _openOdbs.popitem()
+        try:
+            odb_.close()
+        except Exception:
+            pass
+
+# the codes getMultiFOutput stores for each value position, i.e. the position's index in odb.POSITION_NAMES
+_POSITION_CODES = {NODAL: 0, INTEGRATION_POINT: 1, ELEMENT_NODAL: 2, ELEMENT_FACE: 3, CENTROID: 4}
+
+def _locationsFromValues(values):
+    '''
+    Reads the location of each value in a FieldValueArray, one value at a time, into the same arrays getMultiFOutput
+    returns: (nodeIDs, elIDs, integrationPoints, sectionPoints, positions, faceIDs), with -1 where a label doesn't apply.
+    '''
+    numVals = len(values)
+    nodeIDs = np.full(numVals, -1, dtype=np.int32)
+    elIDs = np.full(numVals, -1, dtype=np.int32)
+    intPts = np.full(numVals, -1, dtype=np.int32)
+    sectionPoints = np.full(numVals, -1, dtype=np.int32)
+    positions = np.full(numVals, -1, dtype=np.int8)
+    faceIDs = np.full(numVals, -1, dtype=np.int32)
+    for valID in range(numVals):
+        valObj = values[valID]
+        if valObj.nodeLabel is not None:
+            nodeIDs[valID] = valObj.nodeLabel
+        if valObj.elementLabel is not None:
+            elIDs[valID] = valObj.elementLabel
+        if valObj.integrationPoint is not None:
+            intPts[valID] = valObj.integrationPoint
+        if valObj.sectionPoint is not None:
+            sectionPoints[valID] = valObj.sectionPoint.number
+        positions[valID] = _POSITION_CODES.get(valObj.position, -1)
+        if valObj.face is not None:
+            faceIDs[valID] = valObj.face
+    return nodeIDs, elIDs, intPts, sectionPoints, positions, faceIDs
+
+def _blockToValuesOrder(blockLocations, valLocations):
+    '''
+    Works out where each entry of a field output's bulkDataBlocks sits among its values, by matching up their
+    (nodeIDs, elIDs, integrationPoints, sectionPoints, positions) arrays. Returns an index array perm such that
+    valuesOrdered[perm] = blocksOrdered, or None if the two can't be matched up one to one.
+    '''
+    valKeys = list(zip(*[location.tolist() for location in valLocations]))
+    valIndex = dict((key, valID) for valID, key in enumerate(valKeys))
+    if len(valIndex) != len(valKeys):
+        return None         # some values share a location (e.g. several faces of one element), so there's no telling them apart
+    blockKeys = zip(*[location.tolist() for location in blockLocations])
+    try:
+        perm = np.array([valIndex[key] for key in blockKeys], dtype=np.intp)
+    except KeyError:
+        return None
+    if len(np.unique(perm)) != len(perm):
+        return None
+    return perm
 
 class odb:
-
+    # value positions, in the order getMultiFOutput codes them
+    POSITION_NAMES = ('NODAL', 'INTEGRATION_POINT', 'ELEMENT_NODAL', 'ELEMENT_FACE', 'CENTROID')
 
     def __init__(self, odbPath):
         """
         Initializes the odb class with the path to the .odb file.
+        The file itself isn't opened until something first needs it (see the odb property).
+        Can also be used as a context manager, i.e. 'with odb(odbPath) as o:', to make sure the file gets closed.
 
         Parameters:
         -----------
         odbPath : str
             Path to the output database (.odb file).
         """
-        odb_ = openOdb(odbPath)
-        if odb_ is None:
-            raise FileNotFoundError("Could not open ODB file at {}. Please check the path and try again.".format(odbPath))
-        
-
-        self.odb = odb_
+        self._odb = None            # the Abaqus odb object, once it's been opened
         self.odbPath = odbPath
+        self._odbKey = os.path.abspath(odbPath)     # key into the module's cache of open odbs
+        self._stepCache = {}        # step objects we've already looked up, keyed by name. See _step()
+        self._nodeSetCache = {}     # same for assembly level node sets, keyed by upper case name. See _nodeSet()
+
+
+    @property
+    def odb(self):
+        """
+        The Abaqus odb object. Opens the .odb file (read only) on first access, or reuses it if it's already open in this process.
+        """
+        # the cached odb may have been closed to make room for others since we last used it, or because the file has been
+        # rewritten, in which case open it again
+        if self._odb is None or _cachedOdb(self._odbKey) is not self._odb:
+            odb_ = _openOdbCached(self.odbPath)
+            if odb_ is None:
+                raise FileNotFoundError("Could not open ODB file at {}. Please check the path and try again.".format(self.odbPath))
+            self._odb = odb_
+            self._stepCache = {}    # any steps or sets we held belong to the old odb object
+            self._nodeSetCache = {}
+        return self._odb
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
         
 
     @staticmethod
@@ -43,8 +183,13 @@ class odb:
         bool
             True if the .odb file exists and can be opened, False otherwise.
         """
+        # opening an odb is expensive, so don't bother if there's no file there, or if we've already got it open
+        if not os.path.isfile(odbPath):
+            return False
+        if _cachedOdb(os.path.abspath(odbPath)) is not None:
+            return True
         try:
-            odb_ = openOdb(odbPath)
+            odb_ = openOdb(odbPath, readOnly=True)
             if odb_ is not None:
                 odb_.close()
                 return True
@@ -89,25 +234,56 @@ class odb:
         int
             Number of frames in the step.
         """
-        odb_ = self.odb
         if not self.isStep(stepName):
             raise ValueError("Step '{}' not found in the output database.".format(stepName))
         
-        numFrames = len(odb_.steps[stepName].frames)
+        numFrames = len(self._step(stepName).frames)
         hasFrames = numFrames > 0
 
         return hasFrames, numFrames
 
 
+    def _step(self, stepName):
+        """
+        Returns the named step object, holding on to it so that repeat lookups don't have to go back through the odb's step repository.
+        """
+        odb_ = self.odb     # always go through the property first, so the cache gets cleared if the odb has been closed and reopened
+        step = self._stepCache.get(stepName)
+        if step is None:
+            step = odb_.steps[stepName]
+            self._stepCache[stepName] = step
+        return step
+
+
+    def _nodeSet(self, nodeSetName):
+        """
+        Returns the named assembly level node set, holding on to it in the same way as _step. Raises a ValueError if there isn't one.
+        """
+        odb_ = self.odb     # as in _step, this makes sure the cache isn't holding sets from a closed odb
+        setKey = nodeSetName.upper()
+        nodeSet = self._nodeSetCache.get(setKey)
+        if nodeSet is None:
+            try:
+                nodeSet = odb_.rootAssembly.nodeSets[setKey]
+            except KeyError:
+                raise ValueError("Set '{}' not found in the output database.".format(nodeSetName))
+            self._nodeSetCache[setKey] = nodeSet
+        return nodeSet
+
+
     def close(self):
         """
-        Closes the ODB file.
+        Closes the ODB file. Does nothing if it's already closed, so it's safe to call more than once.
         """
-        if self.odb is not None:
-            self.odb.close()
-            self.odb = None
-        else:
-            raise RuntimeError("ODB file is already closed or was never opened.")
+        if self._odb is not None:
+            # only close it if it's still open, i.e. it hasn't already been closed to make room in the cache
+            entry = _openOdbs.get(self._odbKey)
+            if entry is not None and entry[0] is self._odb:
+                del _openOdbs[self._odbKey]
+                self._odb.close()
+            self._odb = None
+            self._stepCache = {}
+            self._nodeSetCache = {}
         
 
 
@@ -144,32 +320,26 @@ class odb:
             If the specified step or node set does not exist in the ODB file.
         '''
 
-        odb_ = self.odb
-        step = odb_.steps[stepName]
+        step = self._step(stepName)
+        node_set = self._nodeSet(nodeSetName)
 
-        try:
-            node_set = odb_.rootAssembly.nodeSets[nodeSetName.upper()]
-        except KeyError:
-            odb_.close()
-            raise ValueError("Set '{}' not found in the output database.".format(nodeSetName))
-
-        timeSeries = []
-        dataSeries = []
+        # look these up once, outside the loop
+        frames = step.frames
+        compIdx = component-1
 
-        for frame in step.frames:
-            time = frame.frameValue
-            timeSeries.append(time)
+        numFrames = len(frames)
+        timeSeries = np.empty(numFrames)
+        dataSeries = np.empty(numFrames)
 
+        for i, frame in enumerate(frames):
+            timeSeries[i] = frame.frameValue
 
-            dataField = frame.fieldOutputs[variableName]
-            subset = dataField.getSubset(region=node_set)
-            nodeData = subset.values[0]                     # Gives us a FieldValue obect. Index is zero because we assume single node in the set
-            data = nodeData.data[component-1]               # .data is a tuple of the vector components. nodeData also has a load of other handy fields, e.g the invariants etc.
-            dataSeries.append(data)
+            block = frame.fieldOutputs[variableName].getSubset(region=node_set).bulkDataBlocks[0]    # bulk data comes back as numpy arrays, so we don't have to build a FieldValue object
+            dataSeries[i] = block.data[0, compIdx]                                                  # row zero because we assume single node in the set
 
         output = {
-            'time': np.array(timeSeries),                     # I've keyed this as 'time', but really it's arc length if this is a Riks step
-            'data': np.array(dataSeries),
+            'time': timeSeries,                     # I've keyed this as 'time', but really it's arc length if this is a Riks step
+            'data': dataSeries,
             'set': nodeSetName,
             'variable': variableName + str(component),
         }
@@ -179,13 +349,14 @@ class odb:
     
 
 
-    def getMultiFOutput(self, stepName, variableName, frames = None, component = None, invariant = None, region = None):
+    def getMultiFOutput(self, stepName, variableName, frames = None, component = None, invariant = None, region = None, numThreads = None):
         """
         Extracts field output data for a specific variable from a given step in an Abaqus ODB file.
         Can extract either a specific component of a vector/tensor variable or an invariant.
         Each row of output['data'] corresponds to an analysis frame.
 
         Make sure that the region and frame range you query all contain the same number of values.
+        If you're extracting several things from the same step, getMultiFOutputs will do them all in one pass over the frames.
         
         Parameters
         ----------
@@ -206,6 +377,9 @@ class odb:
         region : odb.Region, optional
             An Abaqus odb.Region object to subset the field output (e.g., a node set or element set).
             If None, the entire field output is used. Default is None.
+        numThreads : int, optional
+            Number of threads to read the frames with. Abaqus may well serialise access to the odb internally, so this
+            isn't guaranteed to speed things up - try it on your own models first. Default is None (one frame at a time).
         
         Returns
         -------
@@ -219,6 +393,12 @@ class odb:
                     The name of the variable extracted.
                 - 'component' or 'invariant': int or str
                     The component number or invariant name extracted.
+                - 'positions': numpy.ndarray
+                    int8 code for each value's position, indexing into 'positionNames' (-1 if it's none of those).
+                - 'positionNames': numpy.ndarray
+                    The position names the codes refer to, i.e. odb.POSITION_NAMES.
+                - 'nodeIDs', 'elIDs', 'integrationPoints', 'faceIDs', 'sectionPoints': numpy.ndarray
+                    int32 location labels for each value, -1 where the label doesn't apply.
         
         Raises
         ------
@@ -226,19 +406,34 @@ class odb:
             If both 'component' and 'invariant' are specified, or if neither is specified.
             
         """
-            
+        query = {'variableName': variableName, 'component': component, 'invariant': invariant, 'region': region}
+        return self.getMultiFOutputs(stepName, [query], frames=frames, numThreads=numThreads)[0]
 
-        # validate arguments
-        if component is not None and invariant is not None:
-            raise ValueError("Cannot specify a component AND an invariant")
-        if component is None and invariant is None:
-            raise ValueError("Must specify either a component or an invariant")
-        # ... and set up something handy for the output dict
-        if component is not None:
-            compVariant = str(component)
-        else:
-            compVariant = invariant
-    
+
+
+    def getMultiFOutputs(self, stepName, queries, frames = None, numThreads = None):
+        """
+        Extracts several field outputs from the same step in one pass over its frames, rather than going through all the
+        frames once per output as repeated calls to getMultiFOutput would.
+
+        Parameters
+        ----------
+        stepName : str
+            The name of the analysis step from which to extract data.
+        queries : list of dict
+            One dict per output, holding the getMultiFOutput arguments for it: 'variableName', plus 'component' or
+            'invariant', and optionally 'region'.
+        frames : list of int, optional
+            List of frame indices to extract, shared by all the queries. If None, all frames in the step are extracted.
+        numThreads : int, optional
+            Number of threads to read the frames with. See getMultiFOutput.
+
+        Returns
+        -------
+        list of dict
+            One output dict per query, in the same order as queries. See getMultiFOutput for what's in them.
+            They all share the same 'time' array.
+        """
 
         # work out which frames to extract
         if frames is None:
@@ -250,89 +445,159 @@ class odb:
 
 
         # set some stuff up for the loops
-        if region is None:
-            sampleFrameValues = self.odb.steps[stepName].frames[frameIDs[0]].fieldOutputs[variableName].values
+        stepFrames = self._step(stepName).frames       # look this up once rather than once per frame
+        time = np.zeros(numFrames)                  # preallocate time array
+        time[:] = np.nan                            # set to nan so we can see if we miss any
+
+        # work out how to fill in each query from the first frame we're extracting
+        sampleFrame = stepFrames[frameIDs[0]]
+        extractors = []
+        outputs = []
+        for query in queries:
+            extract, output = self._fOutputExtractor(sampleFrame, numFrames, **query)
+            output['time'] = time
+            extractors.append(extract)
+            outputs.append(output)
+
+        def fillFrame(i, frameID):
+            # fills in row i of time and every query's output from frame frameID
+            # access the frame object and get the time
+            frameObj  = stepFrames[frameID]
+            time[i] = frameObj.frameValue
+
+            fieldOutputs = frameObj.fieldOutputs
+            for extract in extractors:
+                extract(fieldOutputs, i)
+
+        # you can't slice abaqus frame/value objects, so unfortunately we have to loop through them, which is slow
+        # loop over the frames...
+        if not numThreads or numThreads < 2:
+            for i, frameID in enumerate(frameIDs):
+                fillFrame(i, frameID)
         else:
-            sampleFrameValues = self.odb.steps[stepName].frames[frameIDs[0]].fieldOutputs[variableName].getSubset(region=region).values
-        sampleFrameValue = sampleFrameValues[0]
-        if sampleFrameValue.sectionPoint is None:
-            spFlag = False
+            # ...or farm them out to some threads. Each frame writes to its own row
+            with ThreadPoolExecutor(max_workers=numThreads) as executor:
+                list(executor.map(fillFrame, range(numFrames), frameIDs))      # list() so any errors get raised here
+
+        return outputs
+
+
+
+    def _fOutputExtractor(self, sampleFrame, numFrames, variableName, component = None, invariant = None, region = None):
+        """
+        Sets up the extraction of one getMultiFOutput query, using sampleFrame to size the output and read the value locations.
+        Returns a function extract(fieldOutputs, i) which fills in row i of the output from a frame's field outputs, and
+        the output dict (without 'time') it fills in.
+        """
+
+        # validate arguments
+        if component is not None and invariant is not None:
+            raise ValueError("Cannot specify a component AND an invariant")
+        if component is None and invariant is None:
+            raise ValueError("Must specify either a component or an invariant")
+        # ... and set up something handy for the output dict
+        if component is not None:
+            compVariant = str(component)
         else:
-            spFlag = True
-        
+            compVariant = invariant
+
+        if region is None:
+            sampleFOutObj = sampleFrame.fieldOutputs[variableName]
+        else:
+            sampleFOutObj = sampleFrame.fieldOutputs[variableName].getSubset(region=region)
+        sampleFrameValues = sampleFOutObj.values
+        sampleBlocks = sampleFOutObj.bulkDataBlocks
+
         numVals = len(sampleFrameValues)
         valIDs = list(range(numVals))                     # compute here once to speed up the loop
-        time = np.zeros(numFrames)                  # preallocate time array
-        time[:] = np.nan                            # set to nan so we can see if we miss any
         out = np.zeros((numFrames, numVals))        # preallocate output array
         out[:,:] = np.nan
 
-        # preallocate arrays to hold location about the values
-        nodeIDs = np.zeros(numVals)
-        nodeIDs[:] = np.nan
-        elIDs = np.zeros(numVals)
-        elIDs[:] = np.nan
-        intPts = np.zeros(numVals)
-        intPts[:] = np.nan
-        faceIDs = np.zeros(numVals)
-        faceIDs[:] = np.nan
-        sectionPoints = np.zeros(numVals)
-        sectionPoints[:] = np.nan
-        positions = []
-        # populate the location arrays from the sample frame
-        for valID in valIDs:
-            valObj = sampleFrameValues[valID]
-            nodeIDs[valID] = valObj.nodeLabel
-            elIDs[valID] = valObj.elementLabel
-            intPts[valID] = valObj.integrationPoint
-            faceIDs[valID] = valObj.face
-            if spFlag:
+        # preallocate arrays to hold location about the block entries. These are all integer labels, -1 where they don't apply
+        nodeIDs = np.full(numVals, -1, dtype=np.int32)
+        elIDs = np.full(numVals, -1, dtype=np.int32)
+        intPts = np.full(numVals, -1, dtype=np.int32)
+        sectionPoints = np.full(numVals, -1, dtype=np.int32)
+        positions = np.full(numVals, -1, dtype=np.int8)      # codes into POSITION_NAMES, -1 for anything else
+        # populate the location arrays from the sample frame. The bulk data blocks carry the labels as arrays, so we can fill
+        # in a whole block at a time. Labels that don't apply to a block come back empty (or None) and are left as -1.
+        start = 0
+        for block in sampleBlocks:
+            stop = start + len(block.data)
+            if block.nodeLabels is not None and len(block.nodeLabels):
+                nodeIDs[start:stop] = block.nodeLabels
+            if block.elementLabels is not None and len(block.elementLabels):
+                elIDs[start:stop] = block.elementLabels
+            if block.integrationPoints is not None and len(block.integrationPoints):
+                intPts[start:stop] = block.integrationPoints
+            if block.sectionPoint is not None:
                 # the section point object also comes with another attribute - 'description'. You might want to add this in here later.
-                sectionPoints[valID] = valObj.sectionPoint.number
-            if valObj.position == NODAL:
-                positions.append('NODAL')
-            elif valObj.position == INTEGRATION_POINT:
-                positions.append('INTEGRATION_POINT')
-            elif valObj.position == ELEMENT_NODAL:
-                positions.append('ELEMENT_NODAL')
-            elif valObj.position == ELEMENT_FACE:
-                positions.append('ELEMENT_FACE')
-            elif valObj.position == CENTROID:
-                positions.append('CENTROID')
-
-        # you can't slice abaqus frame/value objects, so unfortunately we have to loop through them, which is slow
-        # loop over the frames...
-        for frameID in frameIDs:
-            # access the frame object and get the time
-            frameObj  = self.odb.steps[stepName].frames[frameID]
-            time[frameID] = frameObj.frameValue
-
+                sectionPoints[start:stop] = block.sectionPoint.number
+            positions[start:stop] = _POSITION_CODES.get(block.position, -1)    # one position per block
+            start = stop
+
+        # the values aren't guaranteed to be in the same order as the blocks though (e.g. shell output with several
+        # section points is grouped by section point in the blocks), and faces and any invariant other than mises only
+        # come from the values. So that every query comes out in the same order, the output is always in values order:
+        # take the locations from the values once here, and work out where each block entry goes in that order, so the
+        # rows can still be filled from the blocks. If they can't be matched up, read everything from the values instead.
+        blockLocations = (nodeIDs, elIDs, intPts, sectionPoints, positions)
+        nodeIDs, elIDs, intPts, sectionPoints, positions, faceIDs = _locationsFromValues(sampleFrameValues)
+        perm = _blockToValuesOrder(blockLocations, (nodeIDs, elIDs, intPts, sectionPoints, positions))
+        useBlocks = perm is not None
+
+        # bulkDataBlocks gives us all the values in a frame as numpy arrays in one go, which is much quicker than crossing
+        # into abaqus once per value. The only invariant the blocks carry is mises though, so any other invariant (or
+        # anything at all, if the values and blocks can't be matched up) has to go through the value objects one at a time.
+        # Which of those we need is fixed for the whole call, so pick the function that fills in row i of out from a field
+        # output object here, rather than working it out again on every frame.
+        if component is not None and useBlocks:
+            compIdx = component-1
+            def fill(fOutObj, i):
+                # pull our component out of each block (one per element type/instance) in turn. The blocks can have
+                # different numbers of components (e.g. S on shells and solids), so they can't just be stacked together
+                row = out[i, :]
+                start = 0
+                for block in fOutObj.bulkDataBlocks:
+                    data = block.data
+                    stop = start + len(data)
+                    row[perm[start:stop]] = data[:, compIdx]
+                    start = stop
+        elif invariant == 'mises' and useBlocks:
+            def fill(fOutObj, i):
+                # mises is already one number per value, so the blocks can be stacked straight into the output
+                out[i, perm] = np.concatenate([block.mises for block in fOutObj.bulkDataBlocks])
+        else:
+            if component is not None:
+                compIdx = component-1
+                getValue = lambda valObj: valObj.data[compIdx]
+            else:
+                # check the invariant exists once up front, rather than catching errors on every value
+                if not hasattr(sampleFrameValues[0], invariant):
+                    raise ValueError("Invariant '{}' not found for variable '{}'. Make sure you've formatted the name in camelCase.".format(invariant, variableName))
+                getValue = operator.attrgetter(invariant)       # e.g. getValue(valObj) gives valObj.maxPrincipal
+            def fill(fOutObj, i):
+                values = fOutObj.values
+                row = out[i, :]
+                for valID in valIDs:
+                    row[valID] = getValue(values[valID])
+
+        def extract(fieldOutputs, i):
             # get the field output object, doing any subsetting if required
             if region is None:
-                fOutObj = frameObj.fieldOutputs[variableName]
+                fOutObj = fieldOutputs[variableName]
             else:
                 # at some stage we might want to add the ability to specify a node set or element set here, probably by subcontracting the sub-setting job to another function
-                fOutObj = frameObj.fieldOutputs[variableName].getSubset(region=region)
-            
-            # ...and then loop over the values in that frame
-            for valID in valIDs:
-                valObj = fOutObj.values[valID]
-                if component is not None:
-                    out[frameID, valID] = valObj.data[component-1]      # .data is a numpy array
-                else:
-                    try:
-                        out[frameID, valID] = getattr(valObj, invariant)    # e.g. valObj.mises
-                    except AttributeError:
-                        raise ValueError("Invariant '{}' not found for variable '{}'. Make sure you've formatted the name in camelCase.".format(invariant, variableName))
-        
-        
+                fOutObj = fieldOutputs[variableName].getSubset(region=region)
+            fill(fOutObj, i)
+
         output = {
-            'time': time,               # I've keyed this as 'time', but really it's arc length if this is a Riks step
             'data': out,
             'variable': variableName,
             'compVariant': compVariant,
             'dataName': variableName + compVariant,
             'positions': positions,
+            'positionNames': np.array(self.POSITION_NAMES, dtype=object),     # so whoever reads this can decode positions
             'nodeIDs': nodeIDs,
             'elIDs': elIDs,
             'integrationPoints': intPts,
@@ -340,21 +605,20 @@ class odb:
             'sectionPoints': sectionPoints
         }
 
-        return output
+        return extract, output
 
 
             
 
     def HoutputFromRgn(self, stepName, regionName, variableName):
-        odb_ = self.odb
-        step = odb_.steps[stepName]
-        Houtput = np.array(step.historyRegions[regionName].historyOutputs[variableName].data)
+        step = self._step(stepName)
+        Houtput = np.asarray(step.historyRegions[regionName].historyOutputs[variableName].data, dtype=np.float64)    # .data is a tuple of (time, value) pairs
         time = Houtput[:, 0]        # First column is 'time' (or arc length for Riks)
         data = Houtput[:, 1]        # Second column is the variable data
 
         output = {
-            'time': np.array(time),         # I've keyed this as 'time', but really it's arc length if this is a Riks step
-            'data': np.array(data)
+            'time': time,         # I've keyed this as 'time', but really it's arc length if this is a Riks step
+            'data': data          # both are already views onto Houtput, no need to copy them again
         }
 
         return output
@@ -388,10 +652,10 @@ class odb:
         """
 
         
-        odb_ = self.odb
-        step = odb_.steps[stepName]
+        step = self._step(stepName)
 
-        if 'RIKS' in step.procedure:     
+        # procedure is the step's keyword line (e.g. '*STATIC, RIKS'), so look for RIKS as a whole word rather than anywhere in it
+        if 'RIKS' in step.procedure.replace(',', ' ').split():
             out = self.HoutputFromRgn(stepName, 'Assembly ASSEMBLY', 'LPF')
             output = {
                 'arcLength': out['time'],        
@@ -421,33 +685,25 @@ class odb:
                 If the specified set does not exist in the ODB file.
             """
             odb_ = self.odb
+            setKey = setName.upper()
+
+            # work out where to look for the set: the assembly, or one of its instances
             if not instanceName:
-                try:
-                    region = odb_.rootAssembly.nodeSets[setName.upper()]
-                    return region
-                except KeyError:
-                    pass  # Not a node set, try element sets
-
-                try:
-                    region = odb_.rootAssembly.elementSets[setName.upper()]
-                    return region
-                except KeyError:
-                    raise ValueError("Set '{}' not an element or node set.".format(setName))
-                
+                owner = odb_.rootAssembly
+                notFoundMsg = "Set '{}' not an element or node set.".format(setName)
             else:
-                try:
-                    instance = odb_.rootAssembly.instances[instanceName.upper()]
-                except KeyError:
+                instances = odb_.rootAssembly.instances
+                instKey = instanceName.upper()
+                if instKey not in instances:
                     raise ValueError("Instance '{}' not found in the output database.".format(instanceName))
-                
-                try:
-                    region = instance.nodeSets[setName.upper()]
-                    return region
-                except KeyError:
-                    pass  # Not a node set, try element sets
-
-                try:
-                    region = instance.elementSets[setName.upper()]
-                    return region
-                except KeyError:
-                    raise ValueError("Set '{}' not an element or node set in instance '{}'.".format(setName, instanceName))
\ No newline at end of file
+                owner = instances[instKey]
+                notFoundMsg = "Set '{}' not an element or node set in instance '{}'.".format(setName, instanceName)
+
+            # check membership rather than catching KeyErrors, as every element set lookup would otherwise raise one first
+            nodeSets = owner.nodeSets
+            if setKey in nodeSets:
+                return nodeSets[setKey]
+            elementSets = owner.elementSets
+            if setKey in elementSets:
+                return elementSets[setKey]
+            raise ValueError(notFoundMsg)
\ No newline at end of file
@@ -1,2 +1,3 @@
 ## initialise the py3 sub-module
-from .abYthonScript_ import abYthonScript
\ No newline at end of file
+from .abYthonScript_ import abYthonScript
+from .abYthonWorker_ import abYthonWorker
\ No newline at end of file
@@ -4,9 +4,40 @@ A class to run Abaqus python scripts from within python.
 
 import os
 import time
+import shutil
 import subprocess
 from pathlib import Path
 
+
+def abaqusExe():
+    # on windows abaqus is a .bat file, which only gets found without a shell if we hand over its full path
+    return shutil.which('abaqus') or 'abaqus'
+
+
+def batchSafeCmd(cmd):
+    '''
+    Returns cmd (a list of arguments) in a form that subprocess can run with shell=False.
+    A .bat or .cmd file (which is what abaqus is on windows) always runs through cmd.exe, whatever subprocess is told, so
+    cmd.exe re-parses the command line. In that case the command line is built here instead, with every argument
+    quoted so that things like & and ; get through as plain text. Quotes, % and line breaks can't be passed through
+    cmd.exe reliably at all, so arguments containing them raise a ValueError.
+    '''
+    if not cmd[0].lower().endswith(('.bat', '.cmd')):
+        return cmd
+
+    quoted = []
+    for arg in cmd:
+        if any(char in arg for char in '"%\r\n'):
+            raise ValueError(f"Can't pass {arg!r} to {cmd[0]} - arguments can't contain quotes, % or line breaks.")
+        # backslashes at the end of an argument would escape its closing quote, so double them
+        stripped = arg.rstrip('\\')
+        quoted.append('"' + stripped + '\\' * (2 * (len(arg) - len(stripped))) + '"')
+
+    # /s makes cmd.exe just strip the outer pair of quotes, rather than guessing which quotes to keep
+    comspec = os.environ.get('COMSPEC', 'cmd.exe')
+    return f'"{comspec}" /d /s /c "{" ".join(quoted)}"'
+
+
 class abYthonScript:
     def __init__(self, scriptName, caeKernel = False, runDir = Path.cwd()):
         
@@ -23,60 +54,60 @@ class abYthonScript:
 
     def run(self, userArgs = None):
 
-        # build the command string
-        cmdString = self.buildCmd(userArgs)
+        # build the command
+        cmd = self.buildCmd(userArgs)
 
         # run the script
         print(f'Running script {self.scriptName} in directory {self.runDir}')
         self.runDir.mkdir(parents=True, exist_ok=True)
         start_time = time.time()
-        output = subprocess.run(cmdString, shell=True, cwd=self.runDir, capture_output=True, text=True)
+        # stream the output as it comes rather than holding it all until the end, so long runs show their progress
+        process = subprocess.Popen(cmd, shell=False, cwd=self.runDir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   bufsize=1, text=True)
+        for line in process.stdout:
+            print(line, end='')
+        returncode = process.wait()
         end_time = time.time()
         elapsed_time = end_time - start_time
 
-        print("STDOUT:\n", output.stdout)
-        print("STDERR:\n", output.stderr)
-        print("Exit code:", output.returncode)
+        print("Exit code:", returncode)
         print("Script completed in %.3f seconds" % elapsed_time)
 
-        time.sleep(2)   # wait a couple of seconds to ensure all files are closed properly before cleaning up
         self.cleanUp()
 
 
     def buildCmd(self, userArgs = None):
+        # built as a list of arguments rather than a string, so there's no shell in between to re-parse (and mangle) it.
+        # Except on windows, where abaqus is a .bat and so goes through cmd.exe anyway - see batchSafeCmd
         if self.caeKernel:
-            cmdString = f'abaqus cae noGUI={self.scriptName}'
+            cmd = [abaqusExe(), 'cae', f'noGUI={self.scriptName}']
         else:
-            cmdString = f'abaqus python {self.scriptName}'
+            cmd = [abaqusExe(), 'python', self.scriptName]
 
         if userArgs is not None:
-            cmdString += ' -- '  # Abaqus requires a -- before user args
+            cmd.append('--')  # Abaqus requires a -- before user args
             # do some basic checks on user args
             for arg in userArgs:
                 if not isinstance(arg, str):
                     raise ValueError("All user arguments must be strings.")
                 
-                cmdString += ' "' + arg + '"'
+                cmd.append(arg)
 
-        return cmdString
+        return batchSafeCmd(cmd)
 
 
     def cleanUp(self):
-        
-
-        # change to the run directory
-        currDir = os.getcwd()
-        os.chdir(self.runDir)
-
+        # remove the files abaqus leaves in the run directory. No need to change directory to do it
         for fname in ['abaqus.rpy', 'abaqus.rec']:
-            try:
-                os.remove(fname)
-                print("Removed:", fname)
-            except OSError:
-                pass
-
-        # return to where we were
-        os.chdir(currDir)
-
-
-        
+            filePath = self.runDir / fname
+            # the process has exited by now, but on windows a virus scanner or indexer can still be holding the file
+            # for a moment, so have a few quick goes rather than always waiting
+            for attempt in range(20):
+                try:
+                    filePath.unlink()
+                    print("Removed:", fname)
+                    break
+                except PermissionError:
+                    time.sleep(0.05)
+                except OSError:
+                    break
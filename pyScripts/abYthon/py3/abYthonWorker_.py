@@ -0,0 +1,110 @@
+'''
+A class to run several Abaqus python scripts through one long-lived Abaqus python process.
+Starting Abaqus python takes a few seconds each time, which dominates when you're running lots of short scripts
+(e.g. lots of small odb queries). The worker pays that once and then feeds each script to the same interpreter.
+'''
+
+import time
+import subprocess
+from pathlib import Path
+from .abYthonScript_ import abaqusExe, batchSafeCmd
+
+class abYthonWorker:
+    doneFlag = '__abYthonWorker_done__'     # printed by the interpreter after each script, so we know when it has finished
+
+    def __init__(self, runDir = None, pythonCmd = None):
+        if runDir is None:
+            runDir = Path.cwd()             # worked out here rather than as the default, which would be fixed at import time
+        self.runDir = Path(runDir)          # directory the interpreter runs in. Script names are relative to this
+        self.pythonCmd = pythonCmd          # command (as a list) that starts the interpreter. None means abaqus python
+        self.process = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+        return False
+
+
+    def start(self):
+        # -i keeps the interpreter reading statements from stdin one at a time, rather than waiting for the whole script
+        print(f'Starting Abaqus python worker in directory {self.runDir}')
+        self.runDir.mkdir(parents=True, exist_ok=True)
+        pythonCmd = self.pythonCmd if self.pythonCmd is not None else [abaqusExe(), 'python']
+        self.process = subprocess.Popen(batchSafeCmd(list(pythonCmd) + ['-i']), cwd=self.runDir, text=True, bufsize=1,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+        # turn off the prompts so they don't end up in the output, and wait until the interpreter is ready
+        self._send("import sys; sys.ps1 = sys.ps2 = ''")
+        self._waitForDone()
+
+
+    def run(self, scriptName, userArgs = None):
+        '''
+        Runs a script in the worker and returns everything it printed. userArgs appear to the script in sys.argv as usual.
+        Each script gets a fresh set of globals, but modules it imports stay loaded for the next one.
+        '''
+        if self.process is None:
+            raise RuntimeError("Worker has not been started. Call start() or use it in a with statement.")
+
+        scriptStr = str(scriptName)
+        # ensure script name ends with .py
+        if not scriptStr.endswith('.py'):
+            scriptStr = scriptStr + '.py'
+
+        argv = [scriptStr]
+        if userArgs is not None:
+            # do some basic checks on user args
+            for arg in userArgs:
+                if not isinstance(arg, str):
+                    raise ValueError("All user arguments must be strings.")
+            argv += list(userArgs)
+
+        # this has to run under both python 2 and 3, depending on the Abaqus version. SystemExit is caught so that a
+        # script calling sys.exit() doesn't take the whole worker down with it.
+        print(f'Running script {scriptStr} in worker')
+        start_time = time.time()
+        self._send(f"sys.argv = {argv!r}")
+        self._send("try:\n"
+                   f"    exec(compile(open({scriptStr!r}).read(), {scriptStr!r}, 'exec'), {{'__name__': '__main__'}})\n"
+                   "except SystemExit:\n"
+                   "    pass\n")
+        output = self._waitForDone()
+        elapsed_time = time.time() - start_time
+
+        print("OUTPUT:\n", output)
+        print("Script completed in %.3f seconds" % elapsed_time)
+        return output
+
+
+    def stop(self):
+        # closing stdin gives the interpreter an EOF, which makes it exit
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+
+    def _send(self, statement):
+        self.process.stdin.write(statement + '\n')
+        self.process.stdin.flush()
+
+
+    def _waitForDone(self):
+        # ask the interpreter to print the flag, then collect everything up to it. The flag won't necessarily be on a line
+        # of its own - before the prompts are turned off there's a '>>> ' in front of it, and a script's last print might
+        # not have ended its line - so anything in front of it is kept as output
+        self._send(f"print('{self.doneFlag}'); sys.stdout.flush()")
+        lines = []
+        for line in self.process.stdout:
+            line = line.rstrip('\r\n')
+            if line.endswith(self.doneFlag):
+                lines.append(line[:-len(self.doneFlag)])
+                return '\n'.join(lines)
+            lines.append(line)
+
+        raise RuntimeError("Abaqus python worker exited unexpectedly. Output was:\n" + '\n'.join(lines))
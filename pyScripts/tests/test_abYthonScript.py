@@ -0,0 +1,29 @@
+import pytest
+from abYthon.py3 import abYthonScript
+from abYthon.py3 import abYthonScript_
+
+
+def test_buildCmdIsArgList(monkeypatch):
+    monkeypatch.setattr(abYthonScript_, 'abaqusExe', lambda: '/opt/abaqus/abaqus')
+    cmd = abYthonScript('myScript', runDir='.').buildCmd(['C:\\R&D\\m.odb', 'x"y', 'a;b'])
+    assert cmd == ['/opt/abaqus/abaqus', 'python', 'myScript.py', '--', 'C:\\R&D\\m.odb', 'x"y', 'a;b']
+
+
+def test_buildCmdQuotesEverythingForBat(monkeypatch):
+    monkeypatch.setattr(abYthonScript_, 'abaqusExe', lambda: 'C:\\SIMULIA\\Commands\\abaqus.bat')
+    monkeypatch.setenv('COMSPEC', 'C:\\Windows\\system32\\cmd.exe')
+    cmd = abYthonScript('myScript', caeKernel=True, runDir='.').buildCmd(['C:\\R&D\\m.odb', 'a;b c', 'dir\\', 'x|y^z'])
+    assert cmd == ('"C:\\Windows\\system32\\cmd.exe" /d /s /c ""C:\\SIMULIA\\Commands\\abaqus.bat" "cae" '
+                   '"noGUI=myScript.py" "--" "C:\\R&D\\m.odb" "a;b c" "dir\\\\" "x|y^z""')
+
+
+@pytest.mark.parametrize('arg', ['x"y', '100%', '%PATH%', 'two\nlines'])
+def test_buildCmdRejectsWhatCmdCantPass(monkeypatch, arg):
+    monkeypatch.setattr(abYthonScript_, 'abaqusExe', lambda: 'C:\\SIMULIA\\Commands\\abaqus.BAT')
+    with pytest.raises(ValueError):
+        abYthonScript('myScript', runDir='.').buildCmd([arg])
+
+
+def test_buildCmdRejectsNonStrings():
+    with pytest.raises(ValueError):
+        abYthonScript('myScript', runDir='.').buildCmd([1])
@@ -0,0 +1,28 @@
+import sys
+from abYthon.py3 import abYthonWorker
+
+# abaqus python isn't needed for these, any python interpreter will do as the worker's python
+
+
+def test_runScripts(tmp_path):
+    (tmp_path / 'echoArgs.py').write_text("import sys\nprint(sys.argv[1:])\nprint(__name__)\n")
+    (tmp_path / 'exits.py').write_text("import sys\nprint('exiting')\nsys.exit(1)\n")
+    (tmp_path / 'noNewline.py').write_text("import sys\nsys.stdout.write('partial')\n")
+
+    with abYthonWorker(runDir=tmp_path, pythonCmd=[sys.executable]) as worker:
+        output = worker.run('echoArgs', ['a b', 'c"d;e'])
+        assert output == "['a b', 'c\"d;e']\n__main__\n"
+
+        # sys.exit() in a script shouldn't take the worker down
+        assert worker.run('exits') == "exiting\n"
+        assert worker.run('echoArgs', ['again']) == "['again']\n__main__\n"
+
+        # output that doesn't end its line still comes back
+        assert worker.run('noNewline') == "partial"
+
+    assert worker.process is None
+
+
+def test_runDirDefaultsToCurrentDirectory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert abYthonWorker().runDir == tmp_path